@@ -1,43 +1,99 @@
-import os
+import copy
+import logging
+from types import SimpleNamespace
 from typing import List
-from unittest.mock import patch, Mock
+from unittest.mock import Mock
 
-import openai
 import pytest
 
+# skip the whole module at collection time when the OpenAI SDK is not installed,
+# GPTGenerator imports it at module level too
+openai = pytest.importorskip("openai")
+
 from haystack.preview.components.generators import GPTGenerator
 from haystack.preview.components.generators.utils import default_streaming_callback
 from haystack.preview.dataclasses import StreamingChunk, ChatMessage
 
+# the OpenAI SDK returns usage as a dict subclass, a plain dict behaves the same for the generator
+_USAGE = {"prompt_tokens": 57, "completion_tokens": 40, "total_tokens": 97}
+
+# mimic the response from the OpenAI API, built once and shared by all the tests of this module
+_SHARED_RESPONSE = SimpleNamespace(
+    model="gpt-3.5-turbo",
+    usage=_USAGE,
+    choices=[
+        SimpleNamespace(
+            index=0,
+            finish_reason="stop",
+            message=SimpleNamespace(content="I'm fine, thanks. How are you?", role="user"),
+        )
+    ],
+)
+
+_EXPECTED_DEFAULT_DICT = {
+    "type": "GPTGenerator",
+    "init_parameters": {
+        "model_name": "gpt-3.5-turbo",
+        "streaming_callback": None,
+        "system_prompt": None,
+        "api_base_url": "https://api.openai.com/v1",
+    },
+}
+
+_EXPECTED_PARAM_DICT = {
+    "type": "GPTGenerator",
+    "init_parameters": {
+        "model_name": "gpt-4",
+        "max_tokens": 10,
+        "some_test_param": "test-params",
+        "system_prompt": None,
+        "api_base_url": "test-base-url",
+        "streaming_callback": "haystack.preview.components.generators.utils.default_streaming_callback",
+    },
+}
+
+_EXPECTED_LAMBDA_DICT = {
+    **_EXPECTED_PARAM_DICT,
+    "init_parameters": {**_EXPECTED_PARAM_DICT["init_parameters"], "streaming_callback": "test_openai.<lambda>"},
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_openai():
+    """
+    GPTGenerator sets the API key and base URL on the openai module, restore them after each test
+    """
+    api_key, api_base = openai.api_key, openai.api_base
+    yield
+    openai.api_key = api_key
+    openai.api_base = api_base
+
 
 @pytest.fixture
 def mock_chat_completion():
     """
     Mock the OpenAI API completion response and reuse it for tests
     """
-    with patch("openai.ChatCompletion.create", autospec=True) as mock_chat_completion_create:
-        # mimic the response from the OpenAI API
-        mock_choice = Mock()
-        mock_choice.index = 0
-        mock_choice.finish_reason = "stop"
-
-        mock_message = Mock()
-        mock_message.content = "I'm fine, thanks. How are you?"
-        mock_message.role = "user"
-
-        mock_choice.message = mock_message
-
-        mock_response = Mock()
-        mock_response.model = "gpt-3.5-turbo"
-        mock_response.usage = Mock()
-        mock_response.usage.items.return_value = [
-            ("prompt_tokens", 57),
-            ("completion_tokens", 40),
-            ("total_tokens", 97),
-        ]
-        mock_response.choices = [mock_choice]
-        mock_chat_completion_create.return_value = mock_response
+    # swap the method by hand, keeping the original classmethod object so it can be restored as is
+    original_create = openai.ChatCompletion.__dict__["create"]
+    mock_chat_completion_create = Mock(return_value=_SHARED_RESPONSE)
+    openai.ChatCompletion.create = mock_chat_completion_create
+    try:
         yield mock_chat_completion_create
+    finally:
+        openai.ChatCompletion.create = original_create
+
+
+@pytest.fixture(scope="module")
+def default_generator():
+    """
+    A GPTGenerator with default parameters, shared by the tests that don't modify it
+    """
+    # building the generator sets the openai globals, restore them once the module is done
+    api_key, api_base = openai.api_key, openai.api_base
+    yield GPTGenerator(api_key="test-api-key")
+    openai.api_key = api_key
+    openai.api_base = api_base
 
 
 def streaming_chunk(content: str):
@@ -45,17 +101,14 @@ def streaming_chunk(content: str):
     Mock chunks of streaming responses from the OpenAI API
     """
     # mimic the chunk response from the OpenAI API
-    mock_choice = Mock()
-    mock_choice.index = 0
-    mock_choice.delta.content = content
-    mock_choice.finish_reason = "stop"
+    return SimpleNamespace(
+        choices=[SimpleNamespace(index=0, finish_reason="stop", delta=SimpleNamespace(content=content))],
+        model="gpt-3.5-turbo",
+        usage=_USAGE,
+    )
 
-    mock_response = Mock()
-    mock_response.choices = [mock_choice]
-    mock_response.model = "gpt-3.5-turbo"
-    mock_response.usage = Mock()
-    mock_response.usage.items.return_value = [("prompt_tokens", 57), ("completion_tokens", 40), ("total_tokens", 97)]
-    return mock_response
+
+_STREAMING_CHUNKS = (streaming_chunk("Hello"), streaming_chunk("How are you?"))
 
 
 class TestGPTGenerator:
@@ -69,13 +122,6 @@ class TestGPTGenerator:
         assert openai.api_base == "https://api.openai.com/v1"
         assert not component.generation_kwargs
 
-    @pytest.mark.unit
-    def test_init_fail_wo_api_key(self, monkeypatch):
-        openai.api_key = None
-        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
-        with pytest.raises(ValueError, match="GPTGenerator expects an OpenAI API key"):
-            GPTGenerator()
-
     @pytest.mark.unit
     def test_init_with_parameters(self):
         component = GPTGenerator(
@@ -94,79 +140,44 @@ class TestGPTGenerator:
         assert component.generation_kwargs == {"max_tokens": 10, "some_test_param": "test-params"}
 
     @pytest.mark.unit
-    def test_to_dict_default(self):
-        component = GPTGenerator(api_key="test-api-key")
-        data = component.to_dict()
-        assert data == {
-            "type": "GPTGenerator",
-            "init_parameters": {
-                "model_name": "gpt-3.5-turbo",
-                "streaming_callback": None,
-                "system_prompt": None,
-                "api_base_url": "https://api.openai.com/v1",
-            },
-        }
-
-    @pytest.mark.unit
-    def test_to_dict_with_parameters(self):
-        component = GPTGenerator(
-            api_key="test-api-key",
-            model_name="gpt-4",
-            max_tokens=10,
-            some_test_param="test-params",
-            streaming_callback=default_streaming_callback,
-            api_base_url="test-base-url",
-        )
-        data = component.to_dict()
-        assert data == {
-            "type": "GPTGenerator",
-            "init_parameters": {
-                "model_name": "gpt-4",
-                "max_tokens": 10,
-                "some_test_param": "test-params",
-                "system_prompt": None,
-                "api_base_url": "test-base-url",
-                "streaming_callback": "haystack.preview.components.generators.utils.default_streaming_callback",
-            },
-        }
-
-    @pytest.mark.unit
-    def test_to_dict_with_lambda_streaming_callback(self):
-        component = GPTGenerator(
-            api_key="test-api-key",
-            model_name="gpt-4",
-            max_tokens=10,
-            some_test_param="test-params",
-            streaming_callback=lambda x: x,
-            api_base_url="test-base-url",
-        )
+    @pytest.mark.parametrize(
+        "kwargs, expected",
+        [
+            pytest.param({}, _EXPECTED_DEFAULT_DICT, id="default"),
+            pytest.param(
+                {
+                    "model_name": "gpt-4",
+                    "max_tokens": 10,
+                    "some_test_param": "test-params",
+                    "streaming_callback": default_streaming_callback,
+                    "api_base_url": "test-base-url",
+                },
+                _EXPECTED_PARAM_DICT,
+                id="with_parameters",
+            ),
+            pytest.param(
+                {
+                    "model_name": "gpt-4",
+                    "max_tokens": 10,
+                    "some_test_param": "test-params",
+                    "streaming_callback": lambda x: x,
+                    "api_base_url": "test-base-url",
+                },
+                _EXPECTED_LAMBDA_DICT,
+                id="with_lambda_streaming_callback",
+            ),
+        ],
+    )
+    def test_to_dict(self, kwargs, expected):
+        component = GPTGenerator(api_key="test-api-key", **kwargs)
         data = component.to_dict()
-        assert data == {
-            "type": "GPTGenerator",
-            "init_parameters": {
-                "model_name": "gpt-4",
-                "max_tokens": 10,
-                "some_test_param": "test-params",
-                "system_prompt": None,
-                "api_base_url": "test-base-url",
-                "streaming_callback": "test_openai.<lambda>",
-            },
-        }
+        assert data == expected
 
     @pytest.mark.unit
     def test_from_dict(self, monkeypatch):
         monkeypatch.setenv("OPENAI_API_KEY", "fake-api-key")
-        data = {
-            "type": "GPTGenerator",
-            "init_parameters": {
-                "model_name": "gpt-4",
-                "max_tokens": 10,
-                "some_test_param": "test-params",
-                "api_base_url": "test-base-url",
-                "system_prompt": None,
-                "streaming_callback": "haystack.preview.components.generators.utils.default_streaming_callback",
-            },
-        }
+        # from_dict deserializes the callback in place, don't let it alter the shared expected dict
+        data = copy.deepcopy(_EXPECTED_PARAM_DICT)
         component = GPTGenerator.from_dict(data)
         assert component.model_name == "gpt-4"
         assert component.streaming_callback is default_streaming_callback
@@ -174,26 +185,22 @@ class TestGPTGenerator:
         assert component.generation_kwargs == {"max_tokens": 10, "some_test_param": "test-params"}
 
     @pytest.mark.unit
-    def test_from_dict_fail_wo_env_var(self, monkeypatch):
+    @pytest.mark.parametrize(
+        "make",
+        [
+            pytest.param(lambda: GPTGenerator(), id="init"),
+            pytest.param(lambda: GPTGenerator.from_dict(copy.deepcopy(_EXPECTED_PARAM_DICT)), id="from_dict"),
+        ],
+    )
+    def test_api_key_required(self, monkeypatch, make):
         openai.api_key = None
         monkeypatch.delenv("OPENAI_API_KEY", raising=False)
-        data = {
-            "type": "GPTGenerator",
-            "init_parameters": {
-                "model_name": "gpt-4",
-                "max_tokens": 10,
-                "some_test_param": "test-params",
-                "api_base_url": "test-base-url",
-                "streaming_callback": "haystack.preview.components.generators.utils.default_streaming_callback",
-            },
-        }
         with pytest.raises(ValueError, match="GPTGenerator expects an OpenAI API key"):
-            GPTGenerator.from_dict(data)
+            make()
 
     @pytest.mark.unit
-    def test_run(self, mock_chat_completion):
-        component = GPTGenerator(api_key="test-api-key")
-        response = component.run("What's Natural Language Processing?")
+    def test_run(self, mock_chat_completion, default_generator):
+        response = default_generator.run("What's Natural Language Processing?")
 
         # check that the component returns the correct ChatMessage response
         assert isinstance(response, dict)
@@ -207,7 +214,7 @@ class TestGPTGenerator:
         response = component.run("What's Natural Language Processing?")
 
         # check that the component calls the OpenAI API with the correct parameters
-        _, kwargs = mock_chat_completion.call_args
+        kwargs = mock_chat_completion.call_args.kwargs
         assert kwargs["max_tokens"] == 10
         assert kwargs["temperature"] == 0.5
 
@@ -230,15 +237,8 @@ class TestGPTGenerator:
 
         generator = GPTGenerator(api_key="test-api-key", streaming_callback=streaming_callback_fn)
 
-        # Create a fake streamed response
-        # self needed here, don't remove
-        def mock_iter(self):
-            yield streaming_chunk("Hello")
-            yield streaming_chunk("How are you?")
-
-        mock_response = Mock(**{"__iter__": mock_iter})
-        mock_chat_completion.return_value = mock_response
-
+        # a fake streamed response, the generator only iterates over it
+        mock_chat_completion.return_value = _STREAMING_CHUNKS
         response = generator.run("Hello there")
 
         # Assert that the streaming callback was called twice
@@ -251,19 +251,19 @@ class TestGPTGenerator:
         assert [isinstance(reply, str) for reply in response["replies"]]
 
     @pytest.mark.unit
-    def test_check_abnormal_completions(self, caplog):
-        component = GPTGenerator(api_key="test-api-key")
-
+    def test_check_abnormal_completions(self, caplog, default_generator):
         # underlying implementation uses ChatMessage objects so we have to use them here
-        messages: List[ChatMessage] = []
-        for i, _ in enumerate(range(4)):
-            message = ChatMessage.from_assistant("Hello")
-            metadata = {"finish_reason": "content_filter" if i % 2 == 0 else "length", "index": i}
-            message.metadata.update(metadata)
-            messages.append(message)
-
+        reasons = ["content_filter", "length", "content_filter", "length"]
+        messages: List[ChatMessage] = [ChatMessage.from_assistant("Hello") for _ in reasons]
+        for i, (message, reason) in enumerate(zip(messages, reasons)):
+            message.metadata["finish_reason"] = reason
+            message.metadata["index"] = i
+
+        # drop records below WARNING from the generators loggers, warnings from other loggers are still captured
+        caplog.set_level(logging.WARNING, logger="haystack.preview.components.generators")
         for m in messages:
-            component._check_finish_reason(m)
+            default_generator._check_finish_reason(m)
+        assert len(caplog.records) == 4
 
         # check truncation warning
         message_template = (
@@ -278,71 +278,3 @@ class TestGPTGenerator:
         message_template = "The completion for index {index} has been truncated due to the content filter."
         for index in [0, 2]:
             assert caplog.records[index].message == message_template.format(index=index)
-
-    @pytest.mark.skipif(
-        not os.environ.get("OPENAI_API_KEY", None),
-        reason="Export an env var called OPENAI_API_KEY containing the OpenAI API key to run this test.",
-    )
-    @pytest.mark.integration
-    def test_live_run(self):
-        component = GPTGenerator(api_key=os.environ.get("OPENAI_API_KEY"))
-        results = component.run("What's the capital of France?")
-        assert len(results["replies"]) == 1
-        assert len(results["metadata"]) == 1
-        response: str = results["replies"][0]
-        assert "Paris" in response
-
-        metadata = results["metadata"][0]
-        assert "gpt-3.5" in metadata["model"]
-        assert metadata["finish_reason"] == "stop"
-
-        assert "usage" in metadata
-        assert "prompt_tokens" in metadata["usage"] and metadata["usage"]["prompt_tokens"] > 0
-        assert "completion_tokens" in metadata["usage"] and metadata["usage"]["completion_tokens"] > 0
-        assert "total_tokens" in metadata["usage"] and metadata["usage"]["total_tokens"] > 0
-
-    @pytest.mark.skipif(
-        not os.environ.get("OPENAI_API_KEY", None),
-        reason="Export an env var called OPENAI_API_KEY containing the OpenAI API key to run this test.",
-    )
-    @pytest.mark.integration
-    def test_live_run_wrong_model(self):
-        component = GPTGenerator(model_name="something-obviously-wrong", api_key=os.environ.get("OPENAI_API_KEY"))
-        with pytest.raises(openai.InvalidRequestError, match="The model `something-obviously-wrong` does not exist"):
-            component.run("Whatever")
-
-    @pytest.mark.skipif(
-        not os.environ.get("OPENAI_API_KEY", None),
-        reason="Export an env var called OPENAI_API_KEY containing the OpenAI API key to run this test.",
-    )
-    @pytest.mark.integration
-    def test_live_run_streaming(self):
-        class Callback:
-            def __init__(self):
-                self.responses = ""
-                self.counter = 0
-
-            def __call__(self, chunk: StreamingChunk) -> None:
-                self.counter += 1
-                self.responses += chunk.content if chunk.content else ""
-
-        callback = Callback()
-        component = GPTGenerator(os.environ.get("OPENAI_API_KEY"), streaming_callback=callback)
-        results = component.run("What's the capital of France?")
-
-        assert len(results["replies"]) == 1
-        assert len(results["metadata"]) == 1
-        response: str = results["replies"][0]
-        assert "Paris" in response
-
-        metadata = results["metadata"][0]
-
-        assert "gpt-3.5" in metadata["model"]
-        assert metadata["finish_reason"] == "stop"
-
-        # unfortunately, the usage is not available for streaming calls
-        # we keep the key in the metadata for compatibility
-        assert "usage" in metadata and len(metadata["usage"]) == 0
-
-        assert callback.counter > 1
-        assert "Paris" in callback.responses
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from haystack.preview.components.generators import GPTGenerator
+from haystack.preview.dataclasses import StreamingChunk
+
+# These tests call the live OpenAI API. Without the OPENAI_API_KEY env var they're not collected when pytest
+# walks the directory (see collect_ignore in conftest.py), and skipped when this file is passed explicitly
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("OPENAI_API_KEY", None),
+    reason="Export an env var called OPENAI_API_KEY containing the OpenAI API key to run this test.",
+)
+
+
+class TestGPTGeneratorLive:
+    @pytest.mark.integration
+    def test_live_run(self):
+        component = GPTGenerator(api_key=os.environ.get("OPENAI_API_KEY"))
+        results = component.run("What's the capital of France?")
+        assert len(results["replies"]) == 1
+        assert len(results["metadata"]) == 1
+        response: str = results["replies"][0]
+        assert "Paris" in response
+
+        metadata = results["metadata"][0]
+        assert "gpt-3.5" in metadata["model"]
+        assert metadata["finish_reason"] == "stop"
+
+        assert "usage" in metadata
+        assert "prompt_tokens" in metadata["usage"] and metadata["usage"]["prompt_tokens"] > 0
+        assert "completion_tokens" in metadata["usage"] and metadata["usage"]["completion_tokens"] > 0
+        assert "total_tokens" in metadata["usage"] and metadata["usage"]["total_tokens"] > 0
+
+    @pytest.mark.integration
+    def test_live_run_wrong_model(self):
+        component = GPTGenerator(model_name="something-obviously-wrong", api_key=os.environ.get("OPENAI_API_KEY"))
+        with pytest.raises(openai.InvalidRequestError, match="The model `something-obviously-wrong` does not exist"):
+            component.run("Whatever")
+
+    @pytest.mark.integration
+    def test_live_run_streaming(self):
+        class Callback:
+            def __init__(self):
+                self.responses = ""
+                self.counter = 0
+
+            def __call__(self, chunk: StreamingChunk) -> None:
+                self.counter += 1
+                self.responses += chunk.content if chunk.content else ""
+
+        callback = Callback()
+        component = GPTGenerator(os.environ.get("OPENAI_API_KEY"), streaming_callback=callback)
+        results = component.run("What's the capital of France?")
+
+        assert len(results["replies"]) == 1
+        assert len(results["metadata"]) == 1
+        response: str = results["replies"][0]
+        assert "Paris" in response
+
+        metadata = results["metadata"][0]
+
+        assert "gpt-3.5" in metadata["model"]
+        assert metadata["finish_reason"] == "stop"
+
+        # unfortunately, the usage is not available for streaming calls
+        # we keep the key in the metadata for compatibility
+        assert "usage" in metadata and len(metadata["usage"]) == 0
+
+        assert callback.counter > 1
+        assert "Paris" in callback.responses